@@ -5,13 +5,12 @@ It is not intended to be used directly.
 """
 
 import abc
-import contextlib
 import datetime
 import os
 import shutil
 from collections.abc import Callable
 from pathlib import Path
-from typing import TYPE_CHECKING, Annotated, Any, ClassVar, Final, Generic, Literal, TypeVar
+from typing import TYPE_CHECKING, Annotated, Any, ClassVar, Final, Generic, Literal, Self, TypeVar
 
 import msgspec
 
@@ -64,6 +63,20 @@ class BaseBackupManager(Generic[_id_T], metaclass=abc.ABCMeta):
         self._world = save
         self._backup_dir = backup_dir
 
+    def __enter__(self) -> Self:
+        """Use the manager as a context manager, calling `close` on exit."""
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        """Release resources kept between calls."""
+        self.close()
+
+    def close(self) -> None:
+        """Release resources kept between calls, if any.
+
+        The manager remains usable afterwards.
+        """
+
     def prepare(self) -> None:
         """Prepare the manager for creating the backups.
 
@@ -109,27 +122,35 @@ class BaseBackupManager(Generic[_id_T], metaclass=abc.ABCMeta):
         """Returns a list of backups, ordered newest to oldest."""
 
     def _clear_world(self) -> None:
-        leaves = []
-        for root, dirs, files in os.walk(self._world):
-            has_kept_files = False
-            for name in files:
-                if name in BACKUP_IGNORE_FROZENSET:
-                    has_kept_files = True
-                    continue
-                Path(root, name).unlink()
-
-            if not dirs:
-                if not has_kept_files:
-                    leaves.append(root)
-            else:
-                dirs[:] = set(dirs) - BACKUP_IGNORE_FROZENSET
-        for leaf in leaves:
-            with contextlib.suppress(OSError):
-                os.removedirs(leaf)
+        _clear_dir(self._world)
 
     # TODO: add cron functionality with aiocron
 
 
+def _clear_dir(path: "StrPath") -> bool:
+    """Recursively delete everything in `path` except for entries in BACKUP_IGNORE.
+
+    Directories are removed bottom-up once they are empty, `path` itself is kept.
+
+    Returns:
+        Whether anything was kept.
+    """
+    has_kept_files = False
+    # using os functions on DirEntry.path because creating a Path per file is comparatively slow
+    with os.scandir(path) as scan_it:
+        for entry in scan_it:
+            if entry.name in BACKUP_IGNORE_FROZENSET:
+                has_kept_files = True
+            elif entry.is_dir(follow_symlinks=False):
+                if _clear_dir(entry.path):
+                    has_kept_files = True
+                else:
+                    os.rmdir(entry.path)  # noqa: PTH106
+            else:
+                os.unlink(entry.path)  # noqa: PTH108
+    return has_kept_files
+
+
 def _delete_file_or_dir(path: Path) -> None:
     try:
         path.unlink()
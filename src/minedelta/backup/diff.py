@@ -7,18 +7,28 @@ import concurrent.futures
 import contextlib
 import datetime
 import filecmp
+import functools
+import gzip
+import io
 import os
 import shutil
+import subprocess
 import sys
 import tarfile
 import tempfile
+import threading
 import uuid
-from collections.abc import Callable, Container
+from collections.abc import Callable, Collection, Container, Iterator
 from pathlib import Path, PurePath
-from typing import TYPE_CHECKING, Annotated, Final, Self, TypeVar
+from typing import TYPE_CHECKING, Annotated, Final, Literal, Self, TypeVar
 
 import msgspec
 
+try:
+    from isal import igzip_threaded
+except ImportError:  # pragma: no cover
+    igzip_threaded = None  # type: ignore[assignment]
+
 from minedelta._dummy_executor import DummyExecutor
 from minedelta.region import RegionFile
 
@@ -49,9 +59,28 @@ if _cpu_count is None:
 MAX_WORKERS = _cpu_count or 1
 del _cpu_count
 
+_FICLONE: int | None = None
+if sys.platform == "linux":
+    import fcntl
+
+    # fcntl.FICLONE was only added in 3.12, value from linux/fs.h
+    _FICLONE = getattr(fcntl, "FICLONE", 0x40049409)
+
 # InterpreterPool is not supported due to msgspec single-phase initialization
 _DefaultExecutor = concurrent.futures.ThreadPoolExecutor
 
+# region files mostly contain already compressed chunks, higher levels barely reduce their size
+_COMPRESSLEVEL: Final = 6
+# move gzip streams to and from the file system in large chunks
+_BUFFER_SIZE: Final = 2**20
+
+# number of identical files deleted per task in _filter_diff
+_UNLINK_BATCH_SIZE: Final = 256
+
+# compress on all cores if available, its output is a regular gzip stream. Decompression is
+# single threaded but still moves inflating and checksumming off the GIL onto separate threads
+_PIGZ: Final = shutil.which("pigz")
+
 
 class BackupData(msgspec.Struct, omit_defaults=True):
     timestamp: Annotated[datetime.datetime, msgspec.Meta(tz=True)]
@@ -69,10 +98,15 @@ _BackupDataDECODER: Final = msgspec.msgpack.Decoder(list[BackupData])
 
 
 _PathT = TypeVar("_PathT", bound=PurePath)
+_T = TypeVar("_T")
 
 
 def _extract_backup(
-    backup_dir: Path, temp_dir: _PathT, backup_name: str, skip: Container[str] | None = None
+    backup_dir: Path,
+    temp_dir: _PathT,
+    backup_name: str,
+    skip: Container[str] | None = None,
+    exclude: Callable[[tarfile.TarInfo], bool] | None = None,
 ) -> _PathT:
     """Extract only paths not listed in `skip`.
 
@@ -81,43 +115,197 @@ def _extract_backup(
         temp_dir: Directory to extract to.
         backup_name: Name of backup to extract.
         skip: Set of paths to skip.
+        exclude: Called for every other member, members it returns True for are skipped as well.
 
     Returns:
         the path of the extracted backup.
     """
-    if skip:
+    if skip or exclude:
 
         def custom_filter(member: tarfile.TarInfo, dest_path: str) -> tarfile.TarInfo | None:
-            if member.name in skip:
+            if (skip and member.name in skip) or (exclude and exclude(member)):
                 return None
             return tarfile.data_filter(member, dest_path)
     else:
         custom_filter = tarfile.data_filter
 
     extracted = temp_dir / backup_name
-    with tarfile.open(backup_dir / backup_name, "r:gz") as tar:
+    # archives written by GNU tar have no root member, nothing is created if all are excluded
+    os.makedirs(extracted, exist_ok=True)  # noqa: PTH103
+    with _open_tar_read(backup_dir / backup_name) as tar:
         tar.extractall(extracted, filter=custom_filter)  # noqa: S202
     return extracted
 
 
+@contextlib.contextmanager
+def _open_tar_read(path: Path) -> Iterator[tarfile.TarFile]:
+    """Open a gzip compressed tarfile for sequential reading.
+
+    Decompresses with pigz if installed, otherwise with isal if installed.
+
+    Raises:
+        subprocess.CalledProcessError: pigz failed.
+    """
+    if _PIGZ is None:
+        if igzip_threaded is None:
+            # GzipFile returns little more than what was requested, tarfile reads in small pieces
+            with (
+                gzip.open(path) as gz_file,
+                io.BufferedReader(gz_file, _BUFFER_SIZE) as buffered,
+                tarfile.open(fileobj=buffered, mode="r:") as tar,
+            ):
+                yield tar
+        else:
+            with (
+                igzip_threaded.open(path, "rb") as gz_file,
+                tarfile.open(fileobj=gz_file, mode="r|") as tar,
+            ):
+                yield tar
+        return
+    args = [_PIGZ, "-dc", os.fspath(path)]
+    with subprocess.Popen(args, stdout=subprocess.PIPE) as proc:  # noqa: S603
+        assert proc.stdout is not None  # noqa: S101
+        with tarfile.open(fileobj=proc.stdout, mode="r|") as tar:
+            yield tar
+        # drain the padding after the end of archive marker, otherwise pigz may block on the pipe
+        proc.stdout.read()
+        if proc.wait():
+            raise subprocess.CalledProcessError(proc.returncode, args)
+
+
+@contextlib.contextmanager
+def _open_tar_write(path: Path, mode: Literal["x", "w"]) -> Iterator[tarfile.TarFile]:
+    """Open a gzip compressed tarfile for writing.
+
+    Compresses with pigz if installed, otherwise with isal on `MAX_WORKERS` threads if installed.
+
+    Raises:
+        subprocess.CalledProcessError: pigz failed.
+    """
+    with open(path, f"{mode}b", buffering=_BUFFER_SIZE) as file:
+        if _PIGZ is None:
+            if igzip_threaded is None:
+                with tarfile.open(fileobj=file, mode="w:gz", compresslevel=_COMPRESSLEVEL) as tar:
+                    yield tar
+            else:
+                # isal uses its own level scale, its default is on par with zlib's level 6
+                with (
+                    igzip_threaded.open(file, "wb", threads=MAX_WORKERS) as gz_file,
+                    tarfile.open(fileobj=gz_file, mode="w|") as tar,
+                ):
+                    yield tar
+            return
+        args = _pigz_args(_PIGZ)
+        with subprocess.Popen(args, stdin=subprocess.PIPE, stdout=file) as proc:  # noqa: S603
+            assert proc.stdin is not None  # noqa: S101
+            with proc.stdin, tarfile.open(fileobj=proc.stdin, mode="w|") as tar:
+                yield tar
+            if proc.wait():
+                raise subprocess.CalledProcessError(proc.returncode, args)
+
+
+def _pigz_args(pigz: str) -> list[str]:
+    return [pigz, f"-{_COMPRESSLEVEL}", "-p", str(MAX_WORKERS)]
+
+
+@functools.cache
+def _gnu_tar() -> str | None:
+    """Return the path of GNU tar, if installed. Other implementations take different options."""
+    tar = shutil.which("tar")
+    if tar is None:
+        return None
+    try:
+        version = subprocess.run(  # noqa: S603
+            [tar, "--version"], capture_output=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return tar if version.startswith(b"tar (GNU tar)") else None
+
+
+def _archive_world(world: "StrPath", path: Path) -> None:
+    """Write a compressed archive of `world` to `path`, leaving out BACKUP_IGNORE.
+
+    If both GNU tar and pigz are installed, the data is piped between them without passing through
+    Python at all.
+
+    Raises:
+        subprocess.CalledProcessError: tar or pigz failed.
+    """
+    tar = _gnu_tar() if _PIGZ else None
+    with os.scandir(world) as scan_it:
+        names = sorted(entry.name for entry in scan_it if entry.name not in BACKUP_IGNORE_FROZENSET)
+    # GNU tar refuses to create empty archives
+    if _PIGZ is None or tar is None or not names:
+        with _open_tar_write(path, "x") as new_tar:
+            new_tar.add(world, "", filter=_backup_filter)
+        return
+    # PAX keeps fractional modification times, just like tarfile, but GNU tar would also add atime
+    # and ctime records to every member. Patterns without a slash match the name at any depth,
+    # like _backup_filter, and must come before the names to archive
+    tar_args = [
+        tar,
+        "--format=posix",
+        "--pax-option=delete=atime,delete=ctime",
+        # files changing while they are read are archived as read, like tarfile does
+        "--warning=no-file-changed",
+        "-C",
+        os.fspath(world),
+        *[f"--exclude={name}" for name in BACKUP_IGNORE],
+        "-cf",
+        "-",
+        "--",
+        *names,
+    ]
+    pigz_args = _pigz_args(_PIGZ)
+    with (
+        open(path, "xb") as file,
+        subprocess.Popen(tar_args, stdout=subprocess.PIPE) as tar_proc,  # noqa: S603
+        subprocess.Popen(pigz_args, stdin=tar_proc.stdout, stdout=file) as pigz_proc,  # noqa: S603
+    ):
+        assert tar_proc.stdout is not None  # noqa: S101
+        # pigz has its own copy, pigz exiting early should fail tar with SIGPIPE
+        tar_proc.stdout.close()
+    # GNU tar exits with 1 if a file changed while it was read, which is not an error here
+    if tar_proc.returncode not in {0, 1}:
+        raise subprocess.CalledProcessError(tar_proc.returncode, tar_args)
+    if pigz_proc.returncode:
+        raise subprocess.CalledProcessError(pigz_proc.returncode, pigz_args)
+
+
+def _unchanged_member_filter(
+    world: "StrPath", unchanged: set[str]
+) -> Callable[[tarfile.TarInfo], bool]:
+    """Create an `exclude` function for `_extract_backup` that skips files unchanged in `world`.
+
+    Files with the same size and modification time as in `world` would be deleted by
+    `_filter_diff` right after being extracted, so they are collected in `unchanged` instead.
+    """
+
+    def exclude(member: tarfile.TarInfo) -> bool:
+        if not member.isfile():
+            return False
+        try:
+            stat = os.stat(os.path.join(world, member.name))  # noqa: PTH116, PTH118
+        except OSError:
+            return False
+        # the PAX headers written by tarfile preserve fractional modification times
+        if stat.st_size != member.size or stat.st_mtime != member.mtime:
+            return False
+        unchanged.add(member.name)
+        return True
+
+    return exclude
+
+
 def _backup_filter(tarinfo: tarfile.TarInfo) -> tarfile.TarInfo | None:
     """Filter for creating tarfiles that drops files from BACKUP_IGNORE."""
-    # using os.path because it is not worth it to create a Path just for this
-    if os.path.basename(tarinfo.name) in BACKUP_IGNORE_FROZENSET:  # noqa: PTH119
+    # member names always use "/", rpartition avoids the overhead of os.path.basename per file
+    if tarinfo.name.rpartition("/")[2] in BACKUP_IGNORE_FROZENSET:
         return None
     return tarinfo
 
 
-def _get_executor(
-    executor: concurrent.futures.Executor | None,
-) -> contextlib.nullcontext[concurrent.futures.Executor] | concurrent.futures.Executor:
-    if executor:
-        return contextlib.nullcontext(executor)
-    if MAX_WORKERS == 1:
-        return DummyExecutor()
-    return _DefaultExecutor(max_workers=MAX_WORKERS)
-
-
 class DiffBackupManager(BaseBackupManager[int]):
     """Manager to create backups that only store changed chunks.
 
@@ -133,17 +321,45 @@ class DiffBackupManager(BaseBackupManager[int]):
     ===  ===========  =================
 
     Some methods in this module take an additional `executor` parameter. This allows a
-    ThreadPoolexecutor to be reused between calls. if not specified, a new one with the number of
-    workers equal to the number of available cpu cores will be used
+    ThreadPoolexecutor to be reused between calls. if not specified, a thread pool with the number
+    of workers equal to `MAX_WORKERS` is created on first use and kept until `close()` is called
     """
 
-    __slots__ = ("_backups_data_path",)
+    __slots__ = ("_backups_data_cache", "_backups_data_path", "_executor")
     index_by = "idx"
 
     @override
     def __init__(self, save: "StrPath", backup_dir: Path):
         super().__init__(save, backup_dir)
         self._backups_data_path: Final = backup_dir / "backups.dat"
+        # decoded backups data keyed by inode, modification time and size of the file. Every write
+        # replaces the file, so a new inode also catches rewrites within one timestamp tick
+        self._backups_data_cache: tuple[tuple[int, int, int], list[BackupData]] | None = None
+        # default executor kept between calls, together with the number of workers it was created for
+        self._executor: tuple[int, concurrent.futures.Executor] | None = None
+
+    @override
+    def close(self) -> None:
+        """Shut down the thread pool kept between calls, if any.
+
+        The manager remains usable, a new pool is created when needed.
+        """
+        if self._executor is not None:
+            self._executor[1].shutdown()
+            self._executor = None
+
+    def _get_executor(
+        self, executor: concurrent.futures.Executor | None
+    ) -> contextlib.nullcontext[concurrent.futures.Executor] | concurrent.futures.Executor:
+        if executor:
+            return contextlib.nullcontext(executor)
+        if MAX_WORKERS == 1:
+            return DummyExecutor()
+        if self._executor is None or self._executor[0] != MAX_WORKERS:
+            # MAX_WORKERS has been changed since the pool was created
+            self.close()
+            self._executor = MAX_WORKERS, _DefaultExecutor(max_workers=MAX_WORKERS)
+        return contextlib.nullcontext(self._executor[1])
 
     @override
     def create_backup(
@@ -159,7 +375,7 @@ class DiffBackupManager(BaseBackupManager[int]):
         progress(f'creating backup "{id_}"')
         new_backup = BackupData(timestamp, id_, set(), description)
         try:
-            backups_data = self._load_backups_data()
+            backups_data = self._load_backups_data(detach=True)
             previous: BackupData | None = backups_data[0]
         except (FileNotFoundError, IndexError):
             backups_data = []
@@ -167,25 +383,38 @@ class DiffBackupManager(BaseBackupManager[int]):
         with (
             # create Temporary directory in backup dir to ensure replace succeeds
             tempfile.TemporaryDirectory(dir=self._backup_dir) as _temp_dir,
-            _get_executor(executor) as ex,
+            self._get_executor(executor) as ex,
         ):
             temp_dir = Path(_temp_dir)
             new_backup_file = temp_dir / new_backup.name
-            with tarfile.open(new_backup_file, "x:gz") as new_tar:
-                progress("compressing world")
-                backup_fut = ex.submit(new_tar.add, self._world, "", filter=_backup_filter)
+            progress("compressing world")
+            backup_fut = ex.submit(_archive_world, self._world, new_backup_file)
+            try:
                 if previous:
-                    prev_world = _extract_backup(self._backup_dir, temp_dir, previous.name)
+                    unchanged: set[str] = set()
+                    prev_world = _extract_backup(
+                        self._backup_dir,
+                        temp_dir,
+                        previous.name,
+                        exclude=_unchanged_member_filter(self._world, unchanged),
+                    )
                     progress(f'turning "{previous.id}" into diff')
                     not_present = _filter_diff(
-                        src=self._world, dest=prev_world, executor=ex, progress=progress
+                        src=self._world,
+                        dest=prev_world,
+                        executor=ex,
+                        progress=progress,
+                        unchanged=unchanged,
                     )
                     progress(f'recompressing "{previous.id}"')
                     new_previous = temp_dir / ("new_" + previous.name)
-                    with tarfile.open(new_previous, "x:gz") as prev_tar:
+                    with _open_tar_write(new_previous, "x") as prev_tar:
                         prev_tar.add(prev_world, "")
                 # ensure backup creation went well before overwriting previous
                 backup_fut.result()
+            finally:
+                # the archive must not still be written when the temporary directory is removed
+                _cancel_and_wait([backup_fut])
             new_backup_file.replace(self._backup_dir / new_backup.name)
             if previous:
                 previous.not_present = not_present
@@ -205,7 +434,14 @@ class DiffBackupManager(BaseBackupManager[int]):
         backups_data = self._load_backups_data_validate_idx(id_)
         progress(f'restoring backup "{backups_data[id_].id}"')
         backups_slice = backups_data[1 : id_ + 1]
-        with tempfile.TemporaryDirectory() as _temp_dir, _get_executor(executor) as ex:
+        # extract next to the world so the result can be moved into place instead of copied
+        world = Path(self._world).resolve()
+        # the parent of the file system root is the root itself, which _clear_world would empty
+        staging_dir = self._backup_dir if world.parent == world else world.parent
+        with (
+            tempfile.TemporaryDirectory(prefix=".minedelta-", dir=staging_dir) as _temp_dir,
+            self._get_executor(executor) as ex,
+        ):
             temp_dir = Path(_temp_dir)
             tasks = []
             skip: frozenset[str] = frozenset()
@@ -214,19 +450,27 @@ class DiffBackupManager(BaseBackupManager[int]):
                     ex.submit(_extract_backup, self._backup_dir, temp_dir, backup.name, skip)
                 )
                 skip |= backup.not_present
-            newest_backup = _extract_backup(self._backup_dir, temp_dir, backups_data[0].name, skip)
-            with _RegionFileCache() as region_file_cache:
-                for i, (backup_data, extract_task) in enumerate(
-                    zip(backups_slice, reversed(tasks), strict=True), 1
-                ):
-                    progress(f'[{i}/{len(backups_slice)}] applying "{backup_data.id}"')
-                    _apply_diff(
-                        dest=newest_backup, src=extract_task.result(), cache=region_file_cache
-                    )
+            try:
+                newest_backup = _extract_backup(
+                    self._backup_dir, temp_dir, backups_data[0].name, skip
+                )
+                with _RegionFileCache() as region_file_cache:
+                    for i, (backup_data, extract_task) in enumerate(
+                        zip(backups_slice, reversed(tasks), strict=True), 1
+                    ):
+                        progress(f'[{i}/{len(backups_slice)}] applying "{backup_data.id}"')
+                        _apply_diff(
+                            dest=newest_backup,
+                            src=extract_task.result(),
+                            cache=region_file_cache,
+                            executor=ex,
+                        )
+            finally:
+                _cancel_and_wait(tasks)
             progress("deleting current world")
             self._clear_world()
             progress("restoring backup")
-            shutil.copytree(newest_backup, self._world, dirs_exist_ok=True)
+            _move_into(newest_backup, self._world)
 
     @override
     def delete_backup(
@@ -235,7 +479,7 @@ class DiffBackupManager(BaseBackupManager[int]):
         progress: Callable[[str], None] = _noop,
         executor: concurrent.futures.Executor | None = None,
     ) -> None:
-        backups_data = self._load_backups_data_validate_idx(id_)
+        backups_data = self._load_backups_data_validate_idx(id_, detach=True)
         if id_ == len(backups_data) - 1:  # deleting oldest is easy
             data_chosen = backups_data.pop()
             progress(f'deleting oldest backup "{data_chosen.id}"')
@@ -248,7 +492,11 @@ class DiffBackupManager(BaseBackupManager[int]):
         chosen_not_present = data_chosen.not_present.copy()
         progress(f'merging "{data_older.id}" into "{data_chosen.id}"')
         older_archive = self._backup_dir / data_older.name
-        with tempfile.TemporaryDirectory() as _temp_dir, _get_executor(executor) as ex:
+        with (
+            # extract into the backup dir rather than the system temp dir, which may be in memory
+            tempfile.TemporaryDirectory(dir=self._backup_dir) as _temp_dir,
+            self._get_executor(executor) as ex,
+        ):
             temp_dir = Path(_temp_dir)
             chosen_fut = ex.submit(
                 _extract_backup,
@@ -257,9 +505,12 @@ class DiffBackupManager(BaseBackupManager[int]):
                 data_chosen.name,
                 data_older.not_present,
             )
-            older = _extract_backup(self._backup_dir, temp_dir, data_older.name)
-            chosen = chosen_fut.result()
-            _apply_diff(src=older, dest=chosen, defragment=True)
+            try:
+                older = _extract_backup(self._backup_dir, temp_dir, data_older.name)
+                chosen = chosen_fut.result()
+            finally:
+                _cancel_and_wait([chosen_fut])
+            _apply_diff(src=older, dest=chosen, defragment=True, executor=ex)
             # handle the following situation (1 being deleted):
             # idx | files | diff | new diff
             # 0   | a0    |      |
@@ -269,7 +520,7 @@ class DiffBackupManager(BaseBackupManager[int]):
                 if Path(older, file).exists():
                     chosen_not_present.discard(file)
             progress(f'recompressing "{data_chosen.id}" as "{data_older.name}"')
-            with tarfile.open(older_archive, "w:gz") as tar:
+            with _open_tar_write(older_archive, "w") as tar:
                 tar.add(chosen, "")
 
         if id_:
@@ -294,16 +545,33 @@ class DiffBackupManager(BaseBackupManager[int]):
 
     # Handling backup data
 
-    def _load_backups_data(self) -> list[BackupData]:
+    def _load_backups_data(self, *, detach: bool = False) -> list[BackupData]:
+        """Load the backups data, reusing the previous result if the file did not change.
+
+        Args:
+            detach: Remove the result from the cache. Must be set if the caller mutates it.
+        """
         try:
-            return _BackupDataDECODER.decode(self._backups_data_path.read_bytes())
+            stat = self._backups_data_path.stat()
         except FileNotFoundError:
             return msgspec.json.decode(
                 self._backups_data_path.with_suffix(".json").read_bytes(), type=list[BackupData]
             )
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        cache, self._backups_data_cache = self._backups_data_cache, None
+        if cache is None or cache[0] != key:
+            cache = key, _BackupDataDECODER.decode(self._backups_data_path.read_bytes())
+        if not detach:
+            self._backups_data_cache = cache
+        return cache[1]
 
     def _write_backups_data(self, backups_data: list[BackupData]) -> None:
-        self._backups_data_path.write_bytes(_BackupDataENCODER.encode(backups_data))
+        # replace instead of overwriting so an interrupted write can't corrupt the existing data
+        temp_path = self._backups_data_path.with_suffix(".dat.tmp")
+        temp_path.write_bytes(_BackupDataENCODER.encode(backups_data))
+        temp_path.replace(self._backups_data_path)
+        stat = self._backups_data_path.stat()
+        self._backups_data_cache = (stat.st_ino, stat.st_mtime_ns, stat.st_size), backups_data
 
     def write_backups_data_json(self) -> None:
         """Convert the backups data to human readable JSON format."""
@@ -312,10 +580,12 @@ class DiffBackupManager(BaseBackupManager[int]):
             msgspec.json.format(msgspec.json.encode(decoded, order="deterministic"))
         )
 
-    def _load_backups_data_validate_idx(self, idx: int) -> list[BackupData]:
+    def _load_backups_data_validate_idx(
+        self, idx: int, *, detach: bool = False
+    ) -> list[BackupData]:
         if idx < 0:
             raise IndexError("index must be >= 0")
-        backup_infos = self._load_backups_data()
+        backup_infos = self._load_backups_data(detach=detach)
         if idx >= len(backup_infos):
             raise IndexError(f"no backup found with index {idx}")
         return backup_infos
@@ -330,6 +600,7 @@ def _filter_diff(
     dest: "StrPath",
     executor: concurrent.futures.Executor,
     progress: Callable[[str], None] = _noop,
+    unchanged: Container[str] = frozenset(),
 ) -> set[str]:
     """Delete files and chunks from `dest` in common with `src`. `src` is not altered.
 
@@ -340,67 +611,153 @@ def _filter_diff(
         dest: directory to perform changes in
         executor: Executor to use for filtering
         progress: Will be called with a string describing which anvil file is being filtered
+        unchanged: paths relative to src that are identical in `dest` but were never written there
     Returns: set of files found in `src` but not `dest`, relavtive to src
     """
-    compare = filecmp.dircmp(src, dest, BACKUP_IGNORE)
-    not_present = set()
-    compare_stack = [("", compare)]
-    filter_tasks = []
+    not_present: set[str] = set()
+    same_files, diff_files = _compare_trees(src, dest, not_present, unchanged)
+    # unlinking is left to the executor so it overlaps with filtering region files
+    filter_tasks = [
+        executor.submit(_unlink_all, same_files[i : i + _UNLINK_BATCH_SIZE])
+        for i in range(0, len(same_files), _UNLINK_BATCH_SIZE)
+    ]
     # filter region files
     lazy_progress = (  # only compute relative path if necessary
         _noop if progress is _noop else lambda path: progress(f"filtered {path.relative_to(src)}")
     )
-    while compare_stack:
-        common_dir, compare = compare_stack.pop()
-        compare_stack.extend(compare.subdirs.items())
-        for file in compare.left_only:
-            # documentation warns about this on Windows, but it's fine since Python 3.6 (PEP529)
-            not_present.add(Path(compare.left, file).relative_to(src).as_posix())
-        for file in compare.same_files:
-            Path(compare.right, file).unlink()
-        if common_dir not in MCA_FOLDERS:
-            continue
-        for file in compare.diff_files:
-            src_file = Path(compare.left, file)
-            dest_file = Path(compare.right, file)
-            if not src_file.stat().st_size:
+    try:
+        for rel_path, left, right, is_chunk in diff_files:
+            if not left.stat().st_size:
                 continue
-            if not dest_file.stat().st_size:
-                dest_file.unlink()
-                not_present.add(src_file.relative_to(src).as_posix())
+            if not right.stat().st_size:
+                os.unlink(right.path)  # noqa: PTH108
+                not_present.add(rel_path)
                 continue
             filter_tasks.append(
                 executor.submit(
-                    _filter_region, src_file, dest_file, common_dir == "region", lazy_progress
+                    _filter_region, Path(left.path), Path(right.path), is_chunk, lazy_progress
                 )
             )
+    except BaseException:
+        _cancel_and_wait(filter_tasks)
+        raise
 
-    _collect_filter_tasks(filter_tasks)
+    _collect_tasks(filter_tasks, "Exceptions occured while filtering Regions")
 
     return not_present
 
 
-def _collect_filter_tasks(tasks: list[concurrent.futures.Future[None]]) -> None:
+def _compare_trees(
+    src: "StrPath", dest: "StrPath", not_present: set[str], unchanged: Container[str]
+) -> tuple[list[str], list[tuple[str, os.DirEntry[str], os.DirEntry[str], bool]]]:
+    """Compare `src` and `dest`, walking both trees once.
+
+    Paths only found in `src` are added to `not_present`, unless they are listed in `unchanged`.
+
+    Returns:
+        Paths of files in `dest` that are identical in `src` and differing files in anvil folders
+        as tuples of the path relative to `src`, both entries and whether the folder stores chunks.
+    """
+    same_files = []
+    diff_files = []
+    # relative path of the directory (empty or ending in "/"), its name, left and right path
+    compare_stack = [("", "", os.fspath(src), os.fspath(dest))]
+    while compare_stack:
+        rel_dir, dir_name, left_dir, right_dir = compare_stack.pop()
+        for left, right in _scan_pairs(left_dir, right_dir):
+            if right is None:
+                rel_path = rel_dir + left.name
+                if rel_path not in unchanged:
+                    not_present.add(rel_path)
+            elif left.is_dir():
+                if right.is_dir():
+                    compare_stack.append(
+                        (f"{rel_dir}{left.name}/", left.name, left.path, right.path)
+                    )
+            elif not (left.is_file() and right.is_file()):
+                continue  # mismatched types are left alone, just like filecmp.dircmp does
+            elif _same_contents(left, right):
+                same_files.append(right.path)
+            elif dir_name in MCA_FOLDERS:
+                diff_files.append((rel_dir + left.name, left, right, dir_name == "region"))
+    return same_files, diff_files
+
+
+def _unlink_all(paths: list[str]) -> None:
+    for path in paths:
+        os.unlink(path)  # noqa: PTH108
+
+
+def _scan_pairs(
+    left_dir: str, right_dir: str
+) -> Iterator[tuple[os.DirEntry[str], os.DirEntry[str] | None]]:
+    """Yield entries of `left_dir` with the entry of the same name in `right_dir`, if any.
+
+    Entries from BACKUP_IGNORE are skipped. The `DirEntry` objects cache their stat results.
+    """
+    with os.scandir(right_dir) as scan_it:
+        right_entries = {entry.name: entry for entry in scan_it}
+    with os.scandir(left_dir) as scan_it:
+        for entry in scan_it:
+            if entry.name not in BACKUP_IGNORE_FROZENSET:
+                yield entry, right_entries.get(entry.name)
+
+
+def _same_contents(left: os.DirEntry[str], right: os.DirEntry[str]) -> bool:
+    """Compare two files like `filecmp.cmp`, but using the stat results cached by `os.scandir`.
+
+    Non-empty anvil files with matching sizes are not read, `_filter_region` compares them chunk by
+    chunk.
+    """
+    left_stat, right_stat = left.stat(), right.stat()
+    if left_stat.st_size != right_stat.st_size:
+        return False
+    if not left_stat.st_size or left_stat.st_mtime_ns == right_stat.st_mtime_ns:
+        return True
+    return not left.name.endswith(".mca") and filecmp.cmp(left.path, right.path, shallow=False)
+
+
+def _collect_tasks(tasks: list[concurrent.futures.Future[None]], message: str) -> None:
+    """Wait for all `tasks`, cancelling the remaining ones as soon as one fails.
+
+    Tasks that already started are waited for before raising, so none of them outlive the data
+    they work on.
+
+    Raises:
+        ExceptionGroup: One or more tasks failed. `message` is used as the group's message.
+    """
     done, not_done = concurrent.futures.wait(tasks, return_when=concurrent.futures.FIRST_EXCEPTION)
-    if not not_done:
-        return
-    # an exception occured
-    for fut in not_done:
-        fut.cancel()
+    if not_done:  # an exception occured
+        done |= _cancel_and_wait(not_done)
     is_base = False
     exceptions = []
     for fut in done:
-        if not (exception := fut.exception()):
+        if fut.cancelled() or not (exception := fut.exception()):
             continue
         if not isinstance(exception, Exception):
             is_base = True
         exceptions.append(exception)
+    if not exceptions:
+        return
     # mypy does not get this kind of narrowing
     raise (BaseExceptionGroup if is_base else ExceptionGroup)(  # type: ignore[type-var]
-        "Exceptions occured while filtering Regions", exceptions
+        message, exceptions
     )
 
 
+def _cancel_and_wait(
+    futures: Collection[concurrent.futures.Future[_T]],
+) -> set[concurrent.futures.Future[_T]]:
+    """Cancel `futures` that have not started yet and wait for the others to finish.
+
+    Returns:
+        All of `futures`, now done.
+    """
+    for fut in futures:
+        fut.cancel()
+    return concurrent.futures.wait(futures).done
+
+
 def _filter_region(
     src_file: Path, dest_file: Path, is_chunk: bool, progress: Callable[[Path], None]
 ) -> None:
@@ -415,21 +772,33 @@ def _filter_region(
 
 
 class _RegionFileCache:
-    __slots__ = ("_cached_regions", "_exit_stack")
+    __slots__ = ("_cached_regions", "_exit_stack", "_lock")
 
     def __init__(self) -> None:
-        self._cached_regions: dict[Path, RegionFile] = {}
+        # every region has its own exit stack so it can be closed on its own
+        self._cached_regions: dict[str, tuple[RegionFile, contextlib.ExitStack]] = {}
         self._exit_stack = contextlib.ExitStack()
+        # _apply_diff may request regions from multiple threads
+        self._lock = threading.Lock()
 
     def __enter__(self) -> Self:
         return self
 
-    def get(self, path: Path) -> RegionFile:
-        with contextlib.suppress(KeyError):
-            return self._cached_regions[path]
-        new_region = self._exit_stack.enter_context(RegionFile.open(path))
-        self._cached_regions[path] = new_region
-        return new_region
+    def get(self, path: str) -> RegionFile:
+        with self._lock:
+            with contextlib.suppress(KeyError):
+                return self._cached_regions[path][0]
+            region_stack = self._exit_stack.enter_context(contextlib.ExitStack())
+            new_region = region_stack.enter_context(RegionFile.open(path))
+            self._cached_regions[path] = new_region, region_stack
+            return new_region
+
+    def evict(self, path: str) -> None:
+        """Close the region cached for `path`, if any. Must be called before `path` is replaced."""
+        with self._lock:
+            cached = self._cached_regions.pop(path, None)
+        if cached is not None:
+            cached[1].close()
 
     def __exit__(self, *_: "Unused") -> None:
         self._cached_regions.clear()
@@ -442,33 +811,103 @@ def _apply_diff(
     dest: "StrPath",
     defragment: bool = False,
     cache: _RegionFileCache | None = None,
+    executor: concurrent.futures.Executor | None = None,
 ) -> None:
-    for dirpath, dirs, files in os.walk(src):
-        dest_dirpath = dest / Path(dirpath).relative_to(src)
-        for dirname in dirs:
-            (dest_dirpath / dirname).mkdir(exist_ok=True)
-        for file in files:
-            src_file = Path(dirpath, file)
-            dest_file = dest_dirpath / file
-            if _should_apply_diff(src_file, dest_file):
-                dest_region_cm = (
-                    contextlib.nullcontext(cache.get(dest_file))
-                    if cache
-                    else RegionFile.open(dest_file)
-                )
-                with RegionFile.open(src_file) as src_region, dest_region_cm as dest_region:
-                    dest_region.apply_diff(src_region, defragment)
+    """Apply the diff in `src` to `dest`, one file per task if an `executor` is given.
+
+    Files may be hardlinked from `src` into `dest` and modified there, so `src` should be
+    discarded afterwards.
+    """
+    tasks: list[concurrent.futures.Future[None]] = []
+    submit = executor.submit if executor else DummyExecutor().submit
+    # plain strings and DirEntry objects, whose stat results are cached, instead of os.walk
+    dir_stack = [(os.fspath(src), os.fspath(dest))]
+    try:
+        while dir_stack:
+            src_dir, dest_dir = dir_stack.pop()
+            with os.scandir(src_dir) as scan_it:
+                for entry in scan_it:
+                    dest_path = os.path.join(dest_dir, entry.name)  # noqa: PTH118
+                    if not entry.is_dir():
+                        tasks.append(submit(_apply_file_diff, entry, dest_path, defragment, cache))
+                        continue
+                    # directories are created before any of their files are submitted
+                    os.makedirs(dest_path, exist_ok=True)  # noqa: PTH103
+                    # like os.walk, do not descend into symlinks to directories
+                    if not entry.is_symlink():
+                        dir_stack.append((entry.path, dest_path))
+    except BaseException:
+        _cancel_and_wait(tasks)
+        raise
+    _collect_tasks(tasks, "Exceptions occured while applying diff")
+
+
+def _apply_file_diff(
+    src_entry: os.DirEntry[str], dest_file: str, defragment: bool, cache: _RegionFileCache | None
+) -> None:
+    if not _should_apply_diff(src_entry, dest_file):
+        if cache:
+            # the cached mapping would keep pointing to the replaced file
+            cache.evict(dest_file)
+        _link_or_copy(src_entry.path, dest_file)
+        return
+    dest_region_cm = (
+        contextlib.nullcontext(cache.get(dest_file)) if cache else RegionFile.open(dest_file)
+    )
+    with RegionFile.open(src_entry.path) as src_region, dest_region_cm as dest_region:
+        dest_region.apply_diff(src_region, defragment)
+
+
+def _link_or_copy(src: str, dest: str) -> None:
+    """Replace `dest` with a hardlink to `src`, or a copy if they can't be linked."""
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(dest)  # noqa: PTH108
+    try:
+        os.link(src, dest)
+    except OSError:
+        _copy2(src, dest)
+
+
+def _copy2(src: "StrPath", dest: "StrPath") -> None:
+    """Like `shutil.copy2`, but try to share the data with a reflink first.
+
+    Reflinks are supported by copy-on-write file systems like btrfs and XFS and take constant time.
+    `shutil.copy2` already copies inside the kernel otherwise.
+    """
+    if _FICLONE is not None:
+        with open(src, "rb") as src_f, open(dest, "wb") as dest_f:
+            try:
+                fcntl.ioctl(dest_f.fileno(), _FICLONE, src_f.fileno())
+            except OSError:
+                pass  # not supported by the file system or across file systems
             else:
-                shutil.copy2(src_file, dest_file)
+                shutil.copystat(src, dest)
+                return
+    shutil.copy2(src, dest)
 
 
-def _should_apply_diff(src_file: Path, dest_file: Path) -> bool:
-    if src_file.suffix != ".mca" or not src_file.stat().st_size:
+def _should_apply_diff(src_entry: os.DirEntry[str], dest_file: str) -> bool:
+    if not src_entry.name.endswith(".mca") or not src_entry.stat().st_size:
         return False
     try:
-        if not dest_file.stat().st_size:
+        if not os.stat(dest_file).st_size:  # noqa: PTH116
             return False
     except (OSError, ValueError):
         return False
 
     return True
+
+
+def _move_into(src: "StrPath", dest: "StrPath") -> None:
+    """Move the contents of `src` into the existing directory `dest`, merging directories.
+
+    Entries are renamed if `src` and `dest` are on the same file system and copied with `_copy2`
+    otherwise.
+    """
+    with os.scandir(src) as it:
+        for entry in it:
+            dest_path = os.path.join(dest, entry.name)  # noqa: PTH118
+            if entry.is_dir(follow_symlinks=False) and os.path.isdir(dest_path):  # noqa: PTH112
+                _move_into(entry.path, dest_path)
+            else:
+                shutil.move(entry.path, dest_path, copy_function=_copy2)
@@ -8,15 +8,15 @@ try:
 except ImportError:
     raise ImportError("dulwich is not installed") from None
 
+import contextlib
 import datetime
-import itertools
 import shutil
 import socket
 import sys
 from collections.abc import Callable
 from functools import wraps
 from pathlib import Path
-from typing import TYPE_CHECKING, cast
+from typing import TYPE_CHECKING, Self, cast
 
 import dulwich.errors
 import dulwich.gc
@@ -56,9 +56,43 @@ class GitBackupManager(BaseBackupManager[str]):
       It does not handle merge commits or multiple branches.
     """
 
-    __slots__ = ()
+    __slots__ = ("_keep_repo", "_repo")
     index_by = "id"
 
+    @override
+    def __init__(self, save: "StrPath", backup_dir: Path):
+        super().__init__(save, backup_dir)
+        # inside a with block the repository is kept open between calls so refs and pack indexes
+        # don't have to be loaded every time
+        self._keep_repo = False
+        self._repo: dw.repo.Repo | None = None
+
+    @override
+    def __enter__(self) -> Self:
+        self._keep_repo = True
+        return self
+
+    @override
+    def close(self) -> None:
+        """Close the repository kept open between calls, if any.
+
+        The manager remains usable, calls open the repository for their own duration again.
+        """
+        self._keep_repo = False
+        self._release_repo()
+
+    def _release_repo(self) -> None:
+        if self._repo is not None:
+            self._repo.close()
+            self._repo = None
+
+    def _open_repo(self) -> "contextlib.AbstractContextManager[dw.repo.Repo]":
+        if self._repo is None:
+            if not self._keep_repo:
+                return dw.repo.Repo(self._world)
+            self._repo = dw.repo.Repo(self._world)
+        return contextlib.nullcontext(self._repo)
+
     @classmethod
     def _check_repo(cls, path: "StrPath", bare: bool) -> dw.repo.Repo | None:
         try:
@@ -85,6 +119,8 @@ class GitBackupManager(BaseBackupManager[str]):
 
     @override
     def prepare(self) -> None:
+        # the repository may be moved or recreated below
+        self._release_repo()
         world = Path(self._world)
         world_git = world / ".git"
         r = self._check_repo(self._world, False)
@@ -129,7 +165,7 @@ class GitBackupManager(BaseBackupManager[str]):
     def create_backup(
         self, description: str | None = None, progress: Callable[[str], None] = _noop
     ) -> BackupInfo:
-        with dw.repo.Repo(self._world) as r:
+        with self._open_repo() as r:
             dw.porcelain.add(r)
             progress("creating commit")
             commit_id = r.get_worktree().commit((description or "Automated Backup").encode())
@@ -137,7 +173,7 @@ class GitBackupManager(BaseBackupManager[str]):
 
     @override
     def restore_backup(self, id_: str, progress: Callable[[str], None] = _noop) -> None:
-        with dw.repo.Repo(self._world) as r:
+        with self._open_repo() as r:
             tree = dw.objectspec.parse_tree(r, id_)
             # reset to tree to prevent HEAD from being altered
             # this is undocumented so verify this behavior whenever updating dulwich
@@ -157,30 +193,34 @@ class GitBackupManager(BaseBackupManager[str]):
             id_: Identifier of the backup to delete. Use `BackupInfo.id`
             progress: Will be called with a string describing the progress of the backup deletion
         """
-        with dw.repo.Repo(self._world) as r:
+        with self._open_repo() as r:
             if len(r.refs.keys(base=dw.refs.Ref(dw.refs.LOCAL_BRANCH_PREFIX))) != 1:
                 raise InvalidRepoStateError("Multiple branches detected")
             chosen = dw.objectspec.parse_commit(r, id_)
             chosen_id = chosen.id
             progress(f"preparing to delete {id_[:10]}")
-            walker = r.get_walker()
             last_commits = r.get_parents(chosen_id, chosen)
             if len(last_commits) > 1:
                 raise InvalidRepoStateError("Merge commit detected")
 
             old_head = r.head()
             progress("retrieving child commits")
-            children = [
-                entry.commit
-                for entry in itertools.takewhile(lambda e: e.commit.id != chosen_id, walker)
-            ]
-            progress(f"rewriting {len(children)} commits")
-            for child in reversed(children):  # oldest first
+            # follow the first parents directly, a Walker would also sort and deduplicate
+            children = []
+            child = cast("dw.objects.Commit", r[old_head])
+            while child.id != chosen_id:
                 if len(child.parents) > 1:
                     raise InvalidRepoStateError("Merge commit detected")
+                if not child.parents:
+                    raise InvalidRepoStateError(f"{id_[:10]} is not an ancestor of HEAD")
+                children.append(child)
+                child = cast("dw.objects.Commit", r[child.parents[0]])
+            progress(f"rewriting {len(children)} commits")
+            for child in reversed(children):  # oldest first
                 child.parents = last_commits
-                r.object_store.add_object(child)
                 last_commits = [child.id]
+            # a single pack instead of one loose object per commit
+            r.object_store.add_objects([(child, None) for child in children])
 
             last_commit_id = last_commits[0]
             r.refs.set_if_equals(dw.refs.HEADREF, old_head, last_commit_id)
@@ -193,7 +233,7 @@ class GitBackupManager(BaseBackupManager[str]):
 
     @override
     def list_backups(self) -> list[BackupInfo]:
-        with dw.repo.Repo(self._world) as r:
+        with self._open_repo() as r:
             try:
                 return [self._commit_to_backup_info(entry.commit) for entry in r.get_walker()]
             except KeyError:
@@ -3,9 +3,7 @@
 For more details, see `HardlinkBackupManager`.
 """
 
-import contextlib
 import datetime
-import filecmp
 import operator
 import os
 import shutil
@@ -13,22 +11,68 @@ import sys
 import time
 from collections.abc import Callable, Iterator
 from os import DirEntry
-from pathlib import Path
+from typing import TYPE_CHECKING, Final
 
-from .base import BACKUP_IGNORE, BACKUP_IGNORE_FROZENSET, BackupInfo, BaseBackupManager, _noop
+from .base import BACKUP_IGNORE_FROZENSET, BackupInfo, BaseBackupManager, _noop
 
 if sys.version_info >= (3, 12):
     from typing import override
 else:
     from typing_extensions import override
 
+if TYPE_CHECKING:
+    from _typeshed import StrPath
+
 __all__ = ["HardlinkBackupManager"]
 
 
+_NOTHING_IGNORED: Final[frozenset[str]] = frozenset()
+
+
 def copytree_backup_ignore(_: str, names: list[str]) -> frozenset[str]:
+    # most directories contain none of the ignored names, isdisjoint avoids building a new set
+    if BACKUP_IGNORE_FROZENSET.isdisjoint(names):
+        return _NOTHING_IGNORED
     return BACKUP_IGNORE_FROZENSET.intersection(names)
 
 
+def _copy_or_hardlink(src: "StrPath", prev: str, dest: "StrPath") -> None:
+    """Copy `src` to `dest`, hardlinking files that are unchanged since the backup in `prev`."""
+    compare_stack = [(os.fspath(src), prev, os.fspath(dest))]
+    while compare_stack:
+        left, right, current_new = compare_stack.pop()
+        os.mkdir(current_new)  # noqa: PTH102
+        with os.scandir(right) as scan_it:
+            prev_entries = {entry.name: entry for entry in scan_it}
+        with os.scandir(left) as scan_it:
+            for entry in scan_it:
+                if entry.name in BACKUP_IGNORE_FROZENSET:
+                    continue
+                new_file = os.path.join(current_new, entry.name)  # noqa: PTH118
+                prev_entry = prev_entries.get(entry.name)
+                if entry.is_dir():
+                    if prev_entry is not None and prev_entry.is_dir():
+                        compare_stack.append((entry.path, prev_entry.path, new_file))
+                    else:
+                        shutil.copytree(entry.path, new_file, ignore=copytree_backup_ignore)
+                elif prev_entry is not None and _same_file(entry, prev_entry):
+                    os.link(prev_entry.path, new_file)
+                else:
+                    shutil.copy2(entry.path, new_file)
+
+
+def _same_file(entry: DirEntry[str], other: DirEntry[str]) -> bool:
+    """Shallow comparison of two files based on size and modification time.
+
+    `shutil.copy2` preserves mtimes, so an unmodified file always matches its copy in the
+    previous backup. The stat results are cached by `os.scandir`.
+    """
+    if not other.is_file():
+        return False
+    stat, other_stat = entry.stat(), other.stat()
+    return stat.st_size == other_stat.st_size and stat.st_mtime_ns == other_stat.st_mtime_ns
+
+
 class HardlinkBackupManager(BaseBackupManager[str]):
     """Create backups by copying the world and hardlinking duplicate files to previous backups."""
 
@@ -54,6 +98,8 @@ class HardlinkBackupManager(BaseBackupManager[str]):
             prev, prev_timestamp = max(other_backups, key=operator.itemgetter(1))
         except ValueError:
             progress("copying world (no previous backup found)")
+            # never hardlink to the world: the server rewrites region files in place,
+            # which would silently modify the backup as well
             shutil.copytree(self._world, new_backup, ignore=copytree_backup_ignore)
             return new_info
         if prev_timestamp >= timestamp:
@@ -62,32 +108,19 @@ class HardlinkBackupManager(BaseBackupManager[str]):
         if progress is not _noop:
             prev_datetime = datetime.datetime.fromtimestamp(prev_timestamp, datetime.UTC)
             progress(f"comparing against backup from {prev_datetime}")
-        compare = filecmp.dircmp(self._world, prev, BACKUP_IGNORE)
-        compare_stack = [compare]
-        while compare_stack:
-            compare = compare_stack.pop()
-            compare_stack.extend(compare.subdirs.values())
-
-            current_new = new_backup / Path(compare.right).relative_to(prev)
-            current_new.mkdir(exist_ok=True)
-            for name in compare.left_only + compare.diff_files:
-                file = Path(compare.left, name)
-                new_file = current_new / name
-                try:
-                    shutil.copy2(file, new_file)
-                except IsADirectoryError:
-                    shutil.copytree(file, new_file, ignore=copytree_backup_ignore)
-            for name in compare.same_files:
-                (current_new / name).hardlink_to(Path(compare.right, name))
+        _copy_or_hardlink(self._world, prev.path, new_backup)
         return new_info
 
     def _get_valid_backups(self) -> Iterator[tuple[DirEntry[str], float]]:
         with os.scandir(self._backup_dir) as scan_it:
             for child in scan_it:
-                if not child.is_dir():
+                try:
+                    timestamp = float(child.name)
+                except ValueError:
                     continue
-                with contextlib.suppress(ValueError):
-                    yield (child, float(child.name))
+                # answered from the directory listing on most platforms unless it is a symlink
+                if child.is_dir():
+                    yield child, timestamp
 
     def _get_sorted_backups(self) -> list[tuple[DirEntry[str], float]]:
         return sorted(self._get_valid_backups(), key=operator.itemgetter(1), reverse=True)
@@ -102,6 +135,7 @@ class HardlinkBackupManager(BaseBackupManager[str]):
         if progress is not _noop:
             restore_datetime = datetime.datetime.fromtimestamp(int(id_), datetime.UTC)
             progress(f"restoring backup from {restore_datetime}")
+        # copy instead of hardlinking for the same reason as in create_backup
         shutil.copytree(backup, self._world, dirs_exist_ok=True)
 
     @override
@@ -7,15 +7,16 @@ The term "chunk" is used rather loosely as entities abd POIs are also stored on
 import contextlib
 import mmap
 import operator
+import os
 import struct
 from collections.abc import Callable, Iterator
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, ClassVar, Final, Literal, NamedTuple, Self
+from typing import TYPE_CHECKING, Final, Literal, NamedTuple, Self
 
 from .nbt import compare_nbt
 
 if TYPE_CHECKING:
-    from _typeshed import ReadableBuffer, StrOrBytesPath, Unused, WriteableBuffer
+    from _typeshed import ReadableBuffer, StrOrBytesPath, Unused
 
 __all__ = [
     "DECOMP_LUT",
@@ -57,6 +58,47 @@ SECTOR: Final = 2**12
 """4 KiB"""
 
 
+def _copy_file_range(
+    src_fd: int, dst_fd: int, src_offset: int, dst_offset: int, count: int
+) -> bool:
+    """Copy `count` bytes between two files without passing them through user space.
+
+    Writes through a file descriptor are visible in shared mappings of the same file, so this can
+    be mixed with writes to the mapping. Only available on Linux.
+
+    Returns:
+        Whether the copy succeeded. If not, the caller should fall back to copying via the mapping.
+    """
+    if not hasattr(os, "copy_file_range"):  # pragma: no cover
+        return False
+    try:
+        while count:
+            copied = os.copy_file_range(src_fd, dst_fd, count, src_offset, dst_offset)
+            if not copied:  # pragma: no cover
+                return False
+            src_offset += copied
+            dst_offset += copied
+            count -= copied
+    except OSError:  # pragma: no cover
+        # e.g. unsupported file system or blocked by seccomp
+        return False
+    return True
+
+
+# access pattern hints for the mapping, not available on every platform
+_MADV_SEQUENTIAL: Final[int | None] = getattr(mmap, "MADV_SEQUENTIAL", None)
+_MADV_RANDOM: Final[int | None] = getattr(mmap, "MADV_RANDOM", None)
+
+
+def _madvise(mapping: mmap.mmap, option: int | None) -> None:
+    """Tell the kernel how `mapping` is about to be accessed, if supported."""
+    if option is None:  # pragma: no cover
+        return
+    # only a hint, failing to apply it must not fail the operation
+    with contextlib.suppress(OSError):
+        mapping.madvise(option)
+
+
 class RegionError(Exception):
     """Base class for all region-related errors."""
 
@@ -95,7 +137,7 @@ class ChangesReport(NamedTuple):
     touched: int
 
 
-@dataclass(slots=True, order=True)
+@dataclass(slots=True)
 class ChunkHeader:
     """this class represents rows in the 8KiB header of a region file.
 
@@ -105,25 +147,10 @@ class ChunkHeader:
         mtime: Last modification time in seconds since epoch.
     """
 
-    _table_struct: ClassVar[struct.Struct] = struct.Struct("!I")
-
     offset: int
     size: int
     mtime: int
 
-    @classmethod
-    def load(cls, buf: "ReadableBuffer", offset: int) -> Self:
-        """Load chunk header from a readable `buf` starting at `offset`."""
-        return cls(
-            *divmod(cls._table_struct.unpack_from(buf, offset)[0], 256),
-            *cls._table_struct.unpack_from(buf, offset + SECTOR),
-        )
-
-    def dump(self, buf: "WriteableBuffer", offset: int) -> None:
-        """Dump chunk header to a writeable `buf` starting at `offset`."""
-        self._table_struct.pack_into(buf, offset, (self.offset << 8) + self.size)
-        self._table_struct.pack_into(buf, offset + SECTOR, self.mtime)
-
     @property
     def unmodified(self) -> bool:
         """Whether this chunk is marked as unmodified.
@@ -159,6 +186,10 @@ class ChunkHeader:
         self.offset = self.size = 0
 
 
+# sorting by a plain int key is ~10x faster than comparing the dataclass instances
+_by_offset: Final = operator.attrgetter("offset")
+
+
 class RegionFile:
     """Contains methods for interacting with files in the anvil/region file format.
 
@@ -169,7 +200,10 @@ class RegionFile:
 
     __slots__ = ("_fd", "_headers", "_headers_changed", "_mmap")
 
-    _chunk_heading_struct: Final = struct.Struct("!iB")
+    # bound once, this is called for every chunk that gets compared or read
+    _unpack_chunk_heading: Final = struct.Struct("!iB").unpack_from
+    # one table each for locations and timestamps, parsed in a single call
+    _header_table_struct: Final = struct.Struct(f"!{SECTOR // 4}I")
 
     def __init__(self, fd: int):
         """Create a new `RegionFile` object.
@@ -228,37 +262,65 @@ class RegionFile:
             ChunkLoadingError: Chunk headers could not be loaded.
         """
         try:
-            self._headers = [ChunkHeader.load(self._mmap, offset) for offset in range(0, SECTOR, 4)]
+            locations = self._header_table_struct.unpack_from(self._mmap, 0)
+            mtimes = self._header_table_struct.unpack_from(self._mmap, SECTOR)
         except struct.error as e:
             raise RegionLoadingError("Chunk headers appear truncated") from e
+        self._headers = [
+            ChunkHeader(location >> 8, location & 0xFF, mtime)
+            for location, mtime in zip(locations, mtimes, strict=True)
+        ]
 
     def dump_headers(self) -> None:
         """Write the chunk headers back to the file if they changed."""
         if self._headers_changed:
-            for idx, header in enumerate(self._headers):
-                header.dump(self._mmap, idx * 4)
+            self._header_table_struct.pack_into(
+                self._mmap, 0, *[(header.offset << 8) + header.size for header in self._headers]
+            )
+            self._header_table_struct.pack_into(
+                self._mmap, SECTOR, *[header.mtime for header in self._headers]
+            )
         self._headers_changed = False
 
-    def _get_chunk_data(self, header: ChunkHeader) -> bytes:
-        start = header.offset * SECTOR
+    def _get_chunk_span(self, header: ChunkHeader) -> tuple[int, int, int]:
+        """Return start and end of the compressed chunk payload and its compression type."""
         if header.not_created or header.unmodified:
             raise ChunkLoadingError("Chunk not created or unmodified")
-        size, comp_type = self._chunk_heading_struct.unpack_from(self._mmap, start)
+        start = header.offset * SECTOR
+        size, comp_type = self._unpack_chunk_heading(self._mmap, start)
         start += 5  # actual chunk data starts here
+        return start, start + size - 1, comp_type
+
+    def _decompress(self, start: int, end: int, comp_type: int) -> bytes:
         try:
             decompressor = DECOMP_LUT[comp_type]
         except KeyError:
             raise ChunkLoadingError(f"Unknown compression type: {comp_type}") from None
-        with memoryview(self._mmap)[start : start + size - 1] as view:
+        with memoryview(self._mmap)[start:end] as view:
             return decompressor(view)
 
+    def _get_chunk_data(self, header: ChunkHeader) -> bytes:
+        return self._decompress(*self._get_chunk_span(header))
+
     def _check_unchanged(
         self, this_header: ChunkHeader, other: Self, other_header: ChunkHeader, is_chunk: bool
     ) -> bool:
         if this_header.mtime == other_header.mtime:
             return True
-        this_data = self._get_chunk_data(this_header)
-        other_data = other._get_chunk_data(other_header)
+        this_start, this_end, this_comp = self._get_chunk_span(this_header)
+        other_start, other_end, other_comp = other._get_chunk_span(other_header)
+        if this_comp == other_comp:
+            # comparing the compressed payloads is much cheaper than decompressing and parsing
+            if (
+                this_end - this_start == other_end - other_start
+                and self._mmap[this_start:this_end] == other._mmap[other_start:other_end]
+            ):
+                return True
+            if not is_chunk:
+                # without a LastUpdate tag, differing payloads mean differing data
+                return False
+        this_data = self._decompress(this_start, this_end, this_comp)
+        other_data = other._decompress(other_start, other_end, other_comp)
         if len(this_data) != len(other_data):
             return False
         return compare_nbt(this_data, other_data, is_chunk)
@@ -279,12 +341,12 @@ class RegionFile:
             ChunkLoadingError: Overlapping chunks were detected.
         """
         prev_end = 2
-        # noinspection PyTypeChecker
-        for header in sorted(self._headers):
+        _madvise(self._mmap, _MADV_SEQUENTIAL)
+        for header in sorted(self._headers, key=_by_offset):
             if header.not_created or header.unmodified:
                 continue
             prev_end = self._move_chunk_back(prev_end, header)
-        self._mmap.resize(prev_end * SECTOR)
+        self._truncate(prev_end)
 
     def filter_diff_defragment(self, other: Self, is_chunk: bool = False) -> bool:
         """Drop all chunks in common with other and defragment the file.
@@ -301,8 +363,10 @@ class RegionFile:
         """
         prev_end = 2
         no_missing_chunks = True
+        # chunks are visited in file order
+        _madvise(self._mmap, _MADV_SEQUENTIAL)
         for this_header, other_header in sorted(
-            zip(self._headers, other._headers, strict=True), key=operator.itemgetter(0)
+            zip(self._headers, other._headers, strict=True), key=lambda pair: pair[0].offset
         ):
             if this_header.unmodified:
                 continue
@@ -318,9 +382,14 @@ class RegionFile:
             else:  # defragment
                 prev_end = self._move_chunk_back(prev_end, this_header)
 
-        self._mmap.resize(prev_end * SECTOR)
+        self._truncate(prev_end)
         return no_missing_chunks and prev_end == 2
 
+    def _truncate(self, sectors: int) -> None:
+        # already defragmented files are common, skip the ftruncate and remap for those
+        if sectors * SECTOR != len(self):
+            self._mmap.resize(sectors * SECTOR)
+
     def _move_chunk_back(self, prev_end: int, header: ChunkHeader) -> int:
         if header.offset > prev_end:
             self._mmap.move(prev_end * SECTOR, header.offset * SECTOR, header.size * SECTOR)
@@ -339,8 +408,6 @@ class RegionFile:
             other: Region to apply changes from
             defragment: Whether the file should also be defragmented
         """
-        # TODO: use os.sendfile or os.copy_file_range for improved performance (not
-        #  available on windows but winapi probably has something similar)
         to_be_copied: list[tuple[ChunkHeader, ChunkHeader]] = []
         added_size = 0
         self._headers_changed = True
@@ -355,7 +422,7 @@ class RegionFile:
                     # we can fit the new chunk where the old one was
                     self._mmap.seek(this_header.offset * SECTOR)
                     this_header.size = other_header.size
-                    self._copy_chunk(other_header, other_view)
+                    self._copy_chunk(other, other_header, other_view)
                 else:
                     # new one will be appended to the end
                     to_be_copied.append((this_header, other_header))
@@ -375,14 +442,18 @@ class RegionFile:
             for this_header, other_header in to_be_copied:
                 this_header.offset = self._mmap.tell() // SECTOR
                 this_header.size = other_header.size
-                self._copy_chunk(other_header, other_view)
+                self._copy_chunk(other, other_header, other_view)
 
     # noinspection PyUnresolvedReferences
-    def _copy_chunk(self, other_header: ChunkHeader, other_view: memoryview) -> None:
-        other_start = other_header.offset
-        other_end = other_start + other_header.size
+    def _copy_chunk(self, other: Self, other_header: ChunkHeader, other_view: memoryview) -> None:
+        other_start = other_header.offset * SECTOR
+        size = other_header.size * SECTOR
+        position = self._mmap.tell()
+        if _copy_file_range(other._fd, self._fd, other_start, position, size):
+            self._mmap.seek(position + size)
+            return
         # uses memcpy under the hood
-        with other_view[other_start * SECTOR : other_end * SECTOR] as mv:
+        with other_view[other_start : other_start + size] as mv:
             self._mmap.write(mv)
 
     def report_diff(self, other: Self, is_chunk: bool = False) -> ChangesReport:  # pragma: no cover
@@ -392,6 +463,9 @@ class RegionFile:
         modified = []
         touched = 0
         moved = []
+        # chunks are visited in header order, which is unrelated to their position in the file
+        _madvise(self._mmap, _MADV_RANDOM)
+        _madvise(other._mmap, _MADV_RANDOM)
 
         for idx, (this_header, other_header) in enumerate(
             zip(self._headers, other._headers, strict=True)
@@ -0,0 +1,43 @@
+from pathlib import Path
+
+# noinspection PyProtectedMember
+from minedelta.backup import base
+
+
+class TestClearDir:
+    def test_clear_dir(self, tmp_path: Path) -> None:
+        (tmp_path / "region").mkdir()
+        (tmp_path / "region" / "r.0.0.mca").touch()
+        (tmp_path / "level.dat").touch()
+        (tmp_path / "datapacks").mkdir()
+        (tmp_path / "datapacks" / "pack.zip").touch()
+        (tmp_path / "session.lock").touch()
+        (tmp_path / "data" / "nested").mkdir(parents=True)
+        (tmp_path / "data" / "nested" / "icon.png").touch()
+        (tmp_path / "data" / "map.dat").touch()
+        assert base._clear_dir(tmp_path)
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            "data",
+            "datapacks",
+            "session.lock",
+        ]
+        assert (tmp_path / "datapacks" / "pack.zip").exists()
+        assert [path.name for path in (tmp_path / "data").rglob("*")] == ["nested", "icon.png"]
+
+    def test_nothing_kept(self, tmp_path: Path) -> None:
+        (tmp_path / "region").mkdir()
+        (tmp_path / "region" / "r.0.0.mca").touch()
+        (tmp_path / "level.dat").touch()
+        assert not base._clear_dir(tmp_path)
+        assert not list(tmp_path.iterdir())
+
+    def test_symlinks_not_followed(self, tmp_path: Path) -> None:
+        world = tmp_path / "world"
+        world.mkdir()
+        outside = tmp_path / "outside"
+        outside.mkdir()
+        (outside / "level.dat").touch()
+        (world / "link").symlink_to(outside)
+        assert not base._clear_dir(world)
+        assert not list(world.iterdir())
+        assert (outside / "level.dat").exists()
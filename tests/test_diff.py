@@ -0,0 +1,472 @@
+import os
+import shutil
+import subprocess
+import tarfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, NoReturn, TypeAlias
+
+import pytest
+import rapidnbt as nbt
+
+# noinspection PyProtectedMember
+from minedelta.backup import base, diff
+from minedelta.region import RegionFile
+from tests import helpers
+
+WorldState: TypeAlias = dict[str, bytes | dict[int, tuple[int, bytes]]]
+
+
+class SomeError(Exception):
+    pass
+
+
+def raises() -> None:
+    raise SomeError()
+
+
+@pytest.fixture(params=["gzip", "isal", "pigz"])
+def compression(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> str:
+    """Select how archives are compressed and decompressed."""
+    igzip_threaded = None
+    pigz = None
+    if request.param == "isal":
+        igzip_threaded = pytest.importorskip("isal.igzip_threaded")
+    elif request.param == "pigz":
+        pigz = shutil.which("pigz")
+        if pigz is None:
+            pytest.skip("pigz is not installed")
+    monkeypatch.setattr(diff, "_PIGZ", pigz)
+    monkeypatch.setattr(diff, "igzip_threaded", igzip_threaded)
+    return str(request.param)
+
+
+@pytest.fixture(params=[1, 4])
+def workers(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> int:
+    monkeypatch.setattr(diff, "MAX_WORKERS", request.param)
+    return int(request.param)
+
+
+@pytest.fixture
+def world(tmp_path: Path) -> Path:
+    world = tmp_path / "world"
+    world.mkdir()
+    return world
+
+
+@pytest.fixture
+def backup_dir(tmp_path: Path) -> Path:
+    return tmp_path / "backups"
+
+
+def modify_world(world: Path, step: int) -> None:
+    """Change the world in a different way for every step.
+
+    Every changed file also changes its size, as modification times may be too coarse to tell
+    files written in quick succession apart.
+    """
+    for folder in ("region", "entities"):
+        region_file = world / folder / "r.0.0.mca"
+        if not region_file.exists():
+            region_file.parent.mkdir()
+            helpers.generate_bare_region_file(region_file)
+        tag = nbt.CompoundTag({"LastUpdate": nbt.LongTag(step), "step": nbt.IntTag(step)})
+        helpers.write_nbt_to_region_file(region_file, step % 2, step + 1, tag)
+    (world / "level.dat").write_bytes(bytes([step]) * (step + 1))
+    (world / "data").mkdir(exist_ok=True)
+    (world / "data" / f"{step}.dat").write_text(str(step))
+    if step == 2:
+        (world / "data" / "0.dat").unlink()
+    (world / "session.lock").write_text(str(step))
+
+
+def assert_no_staging_dirs(world: Path) -> None:
+    assert not [path for path in world.parent.iterdir() if path.name.startswith(".minedelta-")]
+
+
+def read_world(world: Path) -> WorldState:
+    """Read all files not in BACKUP_IGNORE, region files chunk by chunk."""
+    state: WorldState = {}
+    for root, dirs, files in os.walk(world):
+        dirs[:] = [name for name in dirs if name not in base.BACKUP_IGNORE_FROZENSET]
+        for name in files:
+            if name in base.BACKUP_IGNORE_FROZENSET:
+                continue
+            path = Path(root, name)
+            rel_path = path.relative_to(world).as_posix()
+            if name.endswith(".mca"):
+                with RegionFile.open(path) as r:
+                    # noinspection PyProtectedMember
+                    state[rel_path] = {
+                        idx: (header.mtime, r._get_chunk_data(header))
+                        for idx, header in enumerate(r._headers)
+                        if not header.not_created
+                    }
+            else:
+                state[rel_path] = path.read_bytes()
+    return state
+
+
+class TestUnchangedMembers:
+    def test_unchanged_member_filter(self, world: Path, tmp_path: Path) -> None:
+        (world / "data").mkdir()
+        (world / "same.dat").write_text("same")
+        (world / "changed.dat").write_text("changed")
+        with tarfile.open(tmp_path / "archive.tar", "w") as tar:
+            members = {
+                name: tar.gettarinfo(world / name, name)
+                for name in ("data", "same.dat", "changed.dat")
+            }
+        (world / "changed.dat").write_text("changed again")
+
+        unchanged: set[str] = set()
+        exclude = diff._unchanged_member_filter(world, unchanged)
+        assert exclude(members["same.dat"])
+        assert not exclude(members["changed.dat"])
+        assert not exclude(members["data"])
+        (world / "same.dat").unlink()
+        assert not exclude(members["same.dat"])
+        assert unchanged == {"same.dat"}
+
+    @pytest.mark.usefixtures("compression")
+    def test_all_members_unchanged(self, world: Path, backup_dir: Path) -> None:
+        # nothing but the root member, if any, is extracted from the previous backup
+        (world / "level.dat").write_text("unchanged")
+        with diff.DiffBackupManager(world, backup_dir) as manager:
+            manager.prepare()
+            manager.create_backup()
+            manager.create_backup()
+            (world / "level.dat").write_text("changed")
+            manager.restore_backup(1)
+        assert (world / "level.dat").read_text() == "unchanged"
+
+
+class TestCompareTrees:
+    def test_compare_trees(self, tmp_path: Path) -> None:
+        src = tmp_path / "src"
+        dest = tmp_path / "dest"
+        for path in src, dest:
+            (path / "region").mkdir(parents=True)
+            (path / "data").mkdir()
+            (path / "same.txt").write_text("same")
+            (path / "level.dat").write_text(path.name)
+            (path / "data" / "map.dat").write_text(path.name)
+            (path / "region" / "r.0.0.mca").write_text(path.name)
+            (path / "region" / "r.0.1.mca").touch()
+        # identical files with different modification times are compared by content
+        os.utime(dest / "same.txt", ns=(0, 0))
+        os.utime(dest / "region" / "r.0.1.mca", ns=(0, 0))
+        (src / "new.txt").write_text("new")
+        (src / "data" / "unchanged.dat").write_text("unchanged")
+        (src / "session.lock").write_text("ignored")
+        (src / "only_src").mkdir()
+
+        not_present: set[str] = set()
+        same_files, diff_files = diff._compare_trees(src, dest, not_present, {"data/unchanged.dat"})
+        assert sorted(same_files) == [str(dest / "region" / "r.0.1.mca"), str(dest / "same.txt")]
+        assert [(rel_path, is_chunk) for rel_path, _, _, is_chunk in diff_files] == [
+            ("region/r.0.0.mca", True)
+        ]
+        assert not_present == {"new.txt", "only_src"}
+
+
+class TestBackupsData:
+    def test_rewritten_by_other_manager(self, world: Path, backup_dir: Path) -> None:
+        (world / "level.dat").write_text("level")
+        with (
+            diff.DiffBackupManager(world, backup_dir) as manager,
+            diff.DiffBackupManager(world, backup_dir) as other,
+        ):
+            manager.prepare()
+            manager.create_backup("a")
+            assert [info.desc for info in manager.list_backups()] == ["a"]
+            data_path = backup_dir / "backups.dat"
+            stat = data_path.stat()
+            # noinspection PyProtectedMember
+            (backup_data,) = other._load_backups_data(detach=True)
+            backup_data.desc = "b"
+            other._write_backups_data([backup_data])
+            # a rewrite of the same size within one timestamp tick
+            assert data_path.stat().st_size == stat.st_size
+            os.utime(data_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            assert [info.desc for info in manager.list_backups()] == ["b"]
+
+
+class TestArchiveWorld:
+    @pytest.mark.usefixtures("compression")
+    def test_archive_world(self, world: Path, tmp_path: Path) -> None:
+        modify_world(world, 0)
+        archive = tmp_path / "archive.tar.gz"
+        diff._archive_world(world, archive)
+        extracted = tmp_path / "extracted"
+        with diff._open_tar_read(archive) as tar:
+            for member in tar:
+                assert not {"atime", "ctime"} & member.pax_headers.keys()
+                tar.extract(member, extracted, filter="data")
+        assert read_world(extracted) == read_world(world)
+        assert not (extracted / "session.lock").exists()
+
+    @pytest.mark.parametrize(("exit_code", "fails"), [(1, False), (2, True)])
+    def test_gnu_tar_exit_code(
+        self,
+        world: Path,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        exit_code: int,
+        fails: bool,
+    ) -> None:
+        gnu_tar = diff._gnu_tar()
+        pigz = shutil.which("pigz")
+        if gnu_tar is None or pigz is None:
+            pytest.skip("GNU tar and pigz are required")
+        fake_tar = tmp_path / "tar"
+        fake_tar.write_text(f'#!/bin/sh\n"{gnu_tar}" "$@"\nexit {exit_code}\n')
+        fake_tar.chmod(0o755)
+        monkeypatch.setattr(diff, "_gnu_tar", lambda: os.fspath(fake_tar))
+        monkeypatch.setattr(diff, "_PIGZ", pigz)
+        modify_world(world, 0)
+        archive = tmp_path / "archive.tar.gz"
+        if fails:
+            with pytest.raises(subprocess.CalledProcessError):
+                diff._archive_world(world, archive)
+            return
+        # exit status 1 means a file changed while it was read
+        diff._archive_world(world, archive)
+        with diff._open_tar_read(archive) as tar:
+            names = {member.name for member in tar}
+        assert "level.dat" in names
+        assert "session.lock" not in names
+
+
+class TestTasks:
+    def test_collect_tasks_last_task_fails(self) -> None:
+        with ThreadPoolExecutor(2) as executor:
+            tasks: list[Future[None]] = [executor.submit(time.sleep, 0), executor.submit(raises)]
+            with pytest.raises(ExceptionGroup) as exc_info:
+                diff._collect_tasks(tasks, "message")
+        assert exc_info.group_contains(SomeError)
+
+    def test_collect_tasks_waits_for_running_tasks(self) -> None:
+        finished = threading.Event()
+
+        def slow() -> None:
+            time.sleep(0.2)
+            finished.set()
+
+        with ThreadPoolExecutor(2) as executor:
+            tasks: list[Future[None]] = [executor.submit(slow), executor.submit(raises)]
+            with pytest.raises(ExceptionGroup):
+                diff._collect_tasks(tasks, "message")
+            assert finished.is_set()
+
+    @pytest.mark.usefixtures("compression")
+    def test_create_backup_waits_for_archive(
+        self, world: Path, backup_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(diff, "MAX_WORKERS", 2)
+        with diff.DiffBackupManager(world, backup_dir) as manager:
+            manager.prepare()
+            modify_world(world, 0)
+            manager.create_backup()
+            (backup_name,) = (path.name for path in backup_dir.glob("*.tar.gz"))
+            (backup_dir / backup_name).write_bytes(b"not a gzip file")
+
+            started = threading.Event()
+            archived = threading.Event()
+            archive_world = diff._archive_world
+            extract_backup = diff._extract_backup
+
+            def slow_archive_world(world: str | os.PathLike[str], path: Path) -> None:
+                started.set()
+                time.sleep(0.2)
+                archive_world(world, path)
+                archived.set()
+
+            def extract_backup_once_archiving(*args: Any, **kwargs: Any) -> Path:  # noqa: ANN401
+                # otherwise the archive task may legitimately be cancelled before it starts
+                assert started.wait(5)
+                return extract_backup(*args, **kwargs)  # type: ignore[no-any-return]
+
+            monkeypatch.setattr(diff, "_archive_world", slow_archive_world)
+            monkeypatch.setattr(diff, "_extract_backup", extract_backup_once_archiving)
+            modify_world(world, 1)
+            with pytest.raises((OSError, tarfile.TarError, subprocess.CalledProcessError)):
+                manager.create_backup()
+            assert archived.is_set()
+            assert len(manager.list_backups()) == 1
+        # the temporary directory is gone and the previous backup was not replaced
+        assert sorted(path.name for path in backup_dir.iterdir()) == sorted(
+            ["backups.dat", backup_name]
+        )
+
+    def test_pool_kept_between_calls(
+        self, world: Path, backup_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(diff, "MAX_WORKERS", 2)
+        (world / "level.dat").write_text("level")
+        with diff.DiffBackupManager(world, backup_dir) as manager:
+            manager.prepare()
+            manager.create_backup()
+            # noinspection PyProtectedMember
+            pool = manager._executor
+            assert pool is not None
+            manager.create_backup()
+            assert manager._executor is pool
+            monkeypatch.setattr(diff, "MAX_WORKERS", 3)
+            manager.create_backup()
+            assert manager._executor is not pool
+            assert manager._executor is not None
+            assert manager._executor[0] == 3
+        assert manager._executor is None
+
+
+@pytest.mark.usefixtures("compression", "workers")
+class TestCompression:
+    def test_open_tar(self, world: Path, tmp_path: Path) -> None:
+        modify_world(world, 0)
+        archive = tmp_path / "archive.tar.gz"
+        with diff._open_tar_write(archive, "x") as tar:
+            tar.add(world, "", filter=diff._backup_filter)
+        with pytest.raises(FileExistsError), diff._open_tar_write(archive, "x"):
+            pass
+
+        extracted = tmp_path / "extracted"
+        with diff._open_tar_read(archive) as tar:
+            tar.extractall(extracted, filter="data")
+        assert read_world(extracted) == read_world(world)
+        assert not (extracted / "session.lock").exists()
+
+    def test_round_trip(self, world: Path, backup_dir: Path) -> None:
+        states: list[WorldState] = []
+        with diff.DiffBackupManager(world, backup_dir) as manager:
+            manager.prepare()
+            for step in range(4):
+                modify_world(world, step)
+                states.insert(0, read_world(world))
+                manager.create_backup(f"backup {step}")
+            assert [info.desc for info in manager.list_backups()] == [
+                f"backup {step}" for step in reversed(range(4))
+            ]
+
+            for idx in (3, 0, 2, 1):
+                manager.restore_backup(idx)
+                assert read_world(world) == states[idx]
+                assert (world / "session.lock").read_text() == "3"
+
+            for idx in (1, 0, 1):
+                manager.delete_backup(idx)
+                del states[idx]
+                for restore_idx in reversed(range(len(states))):
+                    manager.restore_backup(restore_idx)
+                    assert read_world(world) == states[restore_idx]
+            assert len(manager.list_backups()) == 1
+            assert len(list(backup_dir.glob("*.tar.gz"))) == 1
+
+
+class TestMoveIntoWorld:
+    def test_move_into(self, tmp_path: Path) -> None:
+        src = tmp_path / "src"
+        dest = tmp_path / "dest"
+        (src / "data").mkdir(parents=True)
+        (dest / "data").mkdir(parents=True)
+        (src / "data" / "new.dat").write_text("new")
+        (src / "level.dat").write_text("new")
+        (src / "region").mkdir()
+        (dest / "data" / "kept.dat").write_text("kept")
+        (dest / "level.dat").write_text("old")
+
+        diff._move_into(src, dest)
+        # directories merged into existing ones are left behind empty
+        assert not [path for path in src.rglob("*") if not path.is_dir()]
+        assert (dest / "data" / "new.dat").read_text() == "new"
+        assert (dest / "data" / "kept.dat").read_text() == "kept"
+        assert (dest / "level.dat").read_text() == "new"
+        assert (dest / "region").is_dir()
+
+    def test_restore(self, world: Path, backup_dir: Path) -> None:
+        with diff.DiffBackupManager(world, backup_dir) as manager:
+            manager.prepare()
+            modify_world(world, 0)
+            state = read_world(world)
+            manager.create_backup()
+            modify_world(world, 1)
+            manager.restore_backup(0)
+        assert read_world(world) == state
+        assert (world / "session.lock").read_text() == "1"
+        assert_no_staging_dirs(world)
+
+    def test_restore_relative_world(
+        self, world: Path, backup_dir: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.chdir(world)
+        with diff.DiffBackupManager(".", backup_dir) as manager:
+            manager.prepare()
+            modify_world(world, 0)
+            state = read_world(world)
+            manager.create_backup()
+            modify_world(world, 1)
+            manager.create_backup()
+            manager.restore_backup(1)
+        assert read_world(world) == state
+        assert_no_staging_dirs(world)
+
+
+def write_region(path: Path, chunks: dict[int, int]) -> nbt.CompoundTag:
+    """Write a region file with chunks at the given indices, using their timestamp as data."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    helpers.generate_bare_region_file(path)
+    for idx, timestamp in chunks.items():
+        # LastUpdate is ignored when comparing chunks
+        tag = nbt.CompoundTag({"LastUpdate": nbt.LongTag(timestamp), "data": nbt.IntTag(timestamp)})
+        helpers.write_nbt_to_region_file(path, idx, timestamp, tag)
+    return tag
+
+
+def to_diff(path: Path, newer: Path) -> None:
+    with RegionFile.open(path) as region, RegionFile.open(newer) as newer_region:
+        region.filter_diff_defragment(newer_region, is_chunk=True)
+
+
+class TestApplyDiff:
+    @pytest.mark.parametrize("can_link", [True, False])
+    def test_link_or_copy(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, can_link: bool
+    ) -> None:
+        if not can_link:
+
+            def link(*_: object) -> NoReturn:
+                raise OSError("links not supported")
+
+            monkeypatch.setattr(os, "link", link)
+        src = tmp_path / "src"
+        src.write_text("new")
+        for dest in tmp_path / "existing", tmp_path / "missing":
+            if dest.name == "existing":
+                dest.write_text("old")
+            diff._link_or_copy(os.fspath(src), os.fspath(dest))
+            assert dest.read_text() == "new"
+            assert src.samefile(dest) is can_link
+
+    def test_through_empty_region(self, tmp_path: Path) -> None:
+        # diffs are applied newest first, the one for "b" replaces the whole file and the one
+        # for "c" replaces it again, so "d" must not be applied to a region cached before that
+        rel_path = Path("region", "r.0.0.mca")
+        dest = tmp_path / "newest"
+        write_region(dest / rel_path, {0: 5, 1: 5})
+        write_region(tmp_path / "a" / rel_path, {0: 4, 1: 5})
+        to_diff(tmp_path / "a" / rel_path, dest / rel_path)
+        (tmp_path / "b" / rel_path).parent.mkdir(parents=True)
+        (tmp_path / "b" / rel_path).touch()
+        write_region(tmp_path / "c" / rel_path, {0: 3, 1: 3})
+        tag = write_region(tmp_path / "d" / rel_path, {0: 3, 1: 2})
+        to_diff(tmp_path / "d" / rel_path, tmp_path / "c" / rel_path)
+
+        with diff._RegionFileCache() as cache:
+            for name in "abcd":
+                diff._apply_diff(src=tmp_path / name, dest=dest, cache=cache)
+        state = read_world(dest)["region/r.0.0.mca"]
+        assert isinstance(state, dict)
+        assert {idx: mtime for idx, (mtime, _) in state.items()} == {0: 3, 1: 2}
+        assert nbt.nbtio.loads(state[1][1], nbt.NbtFileFormat.BIG_ENDIAN) == tag
@@ -0,0 +1,89 @@
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("dulwich")
+
+import dulwich.repo
+from dulwich.objects import ObjectID
+
+from minedelta.backup import git
+
+
+@pytest.fixture
+def world(tmp_path: Path) -> Path:
+    world = tmp_path / "world"
+    world.mkdir()
+    return world
+
+
+@pytest.fixture
+def manager(world: Path, tmp_path: Path) -> git.GitBackupManager:
+    manager = git.GitBackupManager(world, tmp_path / "backups")
+    manager.prepare()
+    for step in range(4):
+        (world / "level.dat").write_text(str(step))
+        (world / f"{step}.dat").touch()
+        manager.create_backup(str(step))
+    return manager
+
+
+class TestDeleteBackup:
+    @pytest.mark.parametrize("idx", [0, 1, 3])
+    def test_delete_backup(self, manager: git.GitBackupManager, world: Path, idx: int) -> None:
+        infos = manager.list_backups()
+        manager.delete_backup(infos[idx].id)
+        expected = [info.desc for info in infos]
+        del expected[idx]
+        assert [info.desc for info in manager.list_backups()] == expected
+
+        # the remaining backups keep their contents
+        manager.restore_backup(manager.list_backups()[-1].id)
+        oldest = 1 if idx == 3 else 0
+        assert (world / "level.dat").read_text() == str(oldest)
+        assert sorted(path.name for path in world.glob("*.dat")) == sorted(
+            ["level.dat", *[f"{step}.dat" for step in range(oldest + 1)]]
+        )
+
+    def test_not_an_ancestor(self, manager: git.GitBackupManager, world: Path) -> None:
+        with dulwich.repo.Repo(world) as r:
+            # a commit not referenced by any branch
+            dangling = r.get_worktree().commit(b"dangling", ref=None).decode()
+        with pytest.raises(git.InvalidRepoStateError, match="not an ancestor"):
+            manager.delete_backup(dangling)
+        assert len(manager.list_backups()) == 4
+
+    def test_merge_commit(self, manager: git.GitBackupManager, world: Path) -> None:
+        infos = manager.list_backups()
+        with dulwich.repo.Repo(world) as r:
+            r.get_worktree().commit(b"merge", merge_heads=[ObjectID(infos[2].id.encode())])
+        with pytest.raises(git.InvalidRepoStateError, match="Merge commit"):
+            manager.delete_backup(infos[-1].id)
+        assert len(manager.list_backups()) == 5
+
+
+class TestRepoReuse:
+    def test_kept_open_inside_with(self, manager: git.GitBackupManager) -> None:
+        # noinspection PyProtectedMember
+        assert manager._repo is None
+        with manager:
+            manager.list_backups()
+            repo = manager._repo
+            assert repo is not None
+            manager.create_backup("kept open")
+            assert manager._repo is repo
+        assert manager._repo is None
+        assert manager.list_backups()[0].desc == b"kept open"
+        assert manager._repo is None
+
+    def test_prepare_inside_with(self, world: Path, tmp_path: Path) -> None:
+        (world / "level.dat").touch()
+        with git.GitBackupManager(world, tmp_path / "backups") as manager:
+            manager.prepare()
+            manager.create_backup()
+            # the repository is reopened after prepare may have moved it
+            manager.prepare()
+            assert manager._repo is None
+            manager.create_backup()
+            assert len(manager.list_backups()) == 2
+        assert manager._repo is None
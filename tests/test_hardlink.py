@@ -0,0 +1,72 @@
+import shutil
+from pathlib import Path
+
+# noinspection PyProtectedMember
+from minedelta.backup import hardlink
+
+
+class TestCopyOrHardlink:
+    def test_copy_or_hardlink(self, tmp_path: Path) -> None:
+        world = tmp_path / "world"
+        prev = tmp_path / "prev"
+        new = tmp_path / "new"
+        for path in world, prev:
+            (path / "region").mkdir(parents=True)
+            (path / "changed.dat").write_text(path.name)
+            (path / "was_file").write_text("file")
+        (prev / "same.dat").write_text("same")
+        (prev / "region" / "r.0.0.mca").write_text("region")
+        # copy2 preserves modification times, just like the backups do
+        shutil.copy2(prev / "same.dat", world / "same.dat")
+        shutil.copy2(prev / "region" / "r.0.0.mca", world / "region" / "r.0.0.mca")
+        (world / "was_file").unlink()
+        (world / "was_file").mkdir()
+        (world / "was_file" / "level.dat").write_text("new")
+        (world / "was_file" / "session.lock").write_text("ignored")
+        (world / "session.lock").write_text("ignored")
+
+        hardlink._copy_or_hardlink(world, str(prev), new)
+        assert (new / "same.dat").samefile(prev / "same.dat")
+        assert (new / "region" / "r.0.0.mca").samefile(prev / "region" / "r.0.0.mca")
+        assert not (new / "changed.dat").samefile(prev / "changed.dat")
+        assert (new / "changed.dat").read_text() == "world"
+        assert (new / "was_file" / "level.dat").read_text() == "new"
+        assert not (new / "was_file" / "session.lock").exists()
+        assert not (new / "session.lock").exists()
+
+
+class TestHardlinkBackupManager:
+    def test_round_trip(self, tmp_path: Path) -> None:
+        world = tmp_path / "world"
+        world.mkdir()
+        (world / "same.dat").write_text("same")
+        (world / "level.dat").write_text("first")
+        manager = hardlink.HardlinkBackupManager(world, tmp_path / "backups")
+        manager.prepare()
+        first = manager.create_backup()
+        (world / "level.dat").write_text("second")
+        second = manager.create_backup()
+
+        assert [info.id for info in manager.list_backups()] == [second.id, first.id]
+        first_dir = tmp_path / "backups" / first.id
+        second_dir = tmp_path / "backups" / second.id
+        assert (second_dir / "same.dat").samefile(first_dir / "same.dat")
+        assert (second_dir / "level.dat").read_text() == "second"
+
+        manager.restore_backup(first.id)
+        assert (world / "level.dat").read_text() == "first"
+        assert (world / "same.dat").read_text() == "same"
+        # the world must never share files with a backup
+        assert not (world / "same.dat").samefile(first_dir / "same.dat")
+
+    def test_valid_backups(self, tmp_path: Path) -> None:
+        backup_dir = tmp_path / "backups"
+        (backup_dir / "1.5").mkdir(parents=True)
+        (backup_dir / "not a timestamp").mkdir()
+        (backup_dir / "3").touch()
+        (tmp_path / "elsewhere").mkdir()
+        (backup_dir / "2").symlink_to(tmp_path / "elsewhere")
+        manager = hardlink.HardlinkBackupManager(tmp_path / "world", backup_dir)
+        # noinspection PyProtectedMember
+        backups = manager._get_sorted_backups()
+        assert [(entry.name, stamp) for entry, stamp in backups] == [("2", 2.0), ("1.5", 1.5)]
@@ -136,6 +136,16 @@ class TestRegionFile:
         ):
             assert not this._check_unchanged(this._headers[0], other, other._headers[0], False)
 
+    def test__check_unchanged_different_compression(
+        self, dummy_region_file: Path, other_dummy: Path
+    ) -> None:
+        helpers.write_nbt_to_region_file(other_dummy, 0, 2, compression=helpers.Compression.GZIP)
+        with (
+            region.RegionFile.open(dummy_region_file) as this,
+            region.RegionFile.open(other_dummy) as other,
+        ):
+            assert this._check_unchanged(this._headers[0], other, other._headers[0], False)
+
     def test_density_defragment(self, dummy_region_file: Path) -> None:
         with region.RegionFile.open(dummy_region_file) as r:
             assert r.density() == 1